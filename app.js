@@ -350,21 +350,45 @@ function initDoctorUI() {
   };
 }
 
+function overviewPrescriptionItem(x) {
+  return `<li>${x.prescription_id} - <span class="${statusClass(x.status)}">${x.status}</span> (${new Date(x.created_at).toLocaleString()})</li>`;
+}
+
+function overviewReportItem(r) {
+  return `<li><a href="/api/files/reports/${r.id}" target="_blank">${r.file_name}</a></li>`;
+}
+
+// The overview is paged per list; each "Load more" button fetches the page
+// after its list's cursor and then re-arms itself with the following cursor.
+function setOverviewMore(key, cursor, renderItem) {
+  const btn = $(`${key}MoreBtn`);
+  btn.classList.toggle("hidden", cursor == null);
+  btn.onclick = async () => {
+    try {
+      const [beforeTs, beforeId] = cursor;
+      const res = await api(
+        `/api/doctor/patient/${state.selectedPatient.id}/overview/${key}?before_ts=${encodeURIComponent(beforeTs)}&before_id=${encodeURIComponent(beforeId)}`
+      );
+      $(`${key}OverviewList`).insertAdjacentHTML("beforeend", res[key].map(renderItem).join(""));
+      setOverviewMore(key, res.next_cursor, renderItem);
+    } catch (err) {
+      btn.classList.add("hidden");
+      $("patientOverview").insertAdjacentHTML("beforeend", `<p style='color:#b4302f;'>${err.message}</p>`);
+    }
+  };
+}
+
 async function loadDoctorPatientOverview() {
   if (!state.selectedPatient) return;
   try {
     const res = await api(`/api/doctor/patient/${state.selectedPatient.id}/overview`);
     const p = res.profile;
     const prescHtml = res.prescriptions.length
-      ? res.prescriptions
-          .map(
-            (x) => `<li>${x.prescription_id} - <span class="${statusClass(x.status)}">${x.status}</span> (${new Date(x.created_at).toLocaleString()})</li>`
-          )
-          .join("")
+      ? res.prescriptions.map(overviewPrescriptionItem).join("")
       : "<li>No prescriptions yet</li>";
 
     const reportHtml = res.reports.length
-      ? res.reports.map((r) => `<li><a href="/api/files/reports/${r.id}" target="_blank">${r.file_name}</a></li>`).join("")
+      ? res.reports.map(overviewReportItem).join("")
       : "<li>No reports uploaded</li>";
 
     $("patientOverview").innerHTML = `
@@ -372,10 +396,14 @@ async function loadDoctorPatientOverview() {
       <p>Allergies: ${(p.allergies || []).join(", ") || "None"}</p>
       <p>Chronic Conditions: ${(p.chronic_conditions || []).join(", ") || "None"}</p>
       <h4>Past Prescriptions</h4>
-      <ul class="clean">${prescHtml}</ul>
+      <ul class="clean" id="prescriptionsOverviewList">${prescHtml}</ul>
+      <button class="btn-secondary hidden" id="prescriptionsMoreBtn" type="button">Load more prescriptions</button>
       <h4>Reports</h4>
-      <ul class="clean">${reportHtml}</ul>
+      <ul class="clean" id="reportsOverviewList">${reportHtml}</ul>
+      <button class="btn-secondary hidden" id="reportsMoreBtn" type="button">Load more reports</button>
     `;
+    setOverviewMore("prescriptions", res.next_prescriptions_cursor, overviewPrescriptionItem);
+    setOverviewMore("reports", res.next_reports_cursor, overviewReportItem);
   } catch (err) {
     $("patientOverview").innerHTML = `<p style='color:#b4302f;'>${err.message}</p>`;
   }
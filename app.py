@@ -1,16 +1,32 @@
-import json
+import calendar
+import io
+import mimetypes
 import os
 import secrets
+import shutil
 import sqlite3
-from contextlib import closing
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from contextlib import closing, contextmanager
 from datetime import datetime, timedelta
 from functools import wraps
 from pathlib import Path
 
-from flask import Flask, jsonify, render_template, request, send_from_directory
+import orjson
+from flask import Flask, Response, g, jsonify, render_template, request, send_from_directory
+from flask.json.provider import JSONProvider
 from werkzeug.security import check_password_hash, generate_password_hash
 from werkzeug.utils import secure_filename
 
+try:
+    from argon2 import PasswordHasher
+    from argon2.exceptions import InvalidHashError, VerificationError
+except ImportError:  # argon2-cffi is optional; fall back to PBKDF2.
+    PasswordHasher = None
+
 BASE_DIR = Path(__file__).resolve().parent
 DB_PATH = Path(os.environ.get("DATABASE_PATH", str(BASE_DIR / "medsetu.db")))
 UPLOAD_DIR = Path(os.environ.get("UPLOAD_DIR", str(BASE_DIR / "uploads")))
@@ -19,10 +35,40 @@ EXTERNAL_DIR = UPLOAD_DIR / "external"
 
 ACCESS_WINDOW_MINUTES = 30
 SESSION_HOURS = 8
+SESSION_SWEEP_SECONDS = 5 * 60
+PRESCRIPTION_CACHE_SIZE = 4096
+OVERVIEW_PAGE_SIZE = 50
+OVERVIEW_MAX_PAGE_SIZE = 200
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+ULID_ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+PBKDF2_ITERATIONS = int(os.environ.get("PBKDF2_ITERATIONS", "600000"))
+
+PASSWORD_HASHER = PasswordHasher(time_cost=2, memory_cost=19456, parallelism=1) if PasswordHasher else None
+
+
+class OrjsonProvider(JSONProvider):
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        # Hand orjson's bytes straight to the response, skipping the str round trip.
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(orjson.dumps(obj), mimetype="application/json")
+
 
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 app.config["SECRET_KEY"] = os.environ.get("SECRET_KEY", "medsetu-dev-secret")
 app.config["MAX_CONTENT_LENGTH"] = 10 * 1024 * 1024
+# Behind Apache/lighttpd, USE_X_SENDFILE=1 makes send_from_directory emit an
+# X-Sendfile header instead of streaming the file through the worker.
+app.config["USE_X_SENDFILE"] = os.environ.get("USE_X_SENDFILE") == "1"
+# Behind nginx, set this to an internal location aliased to UPLOAD_DIR, e.g.
+# "location /_protected/ { internal; alias /var/medsetu/uploads/; }".
+X_ACCEL_REDIRECT_PREFIX = os.environ.get("X_ACCEL_REDIRECT_PREFIX", "")
 
 REPORTS_DIR.mkdir(parents=True, exist_ok=True)
 EXTERNAL_DIR.mkdir(parents=True, exist_ok=True)
@@ -52,25 +98,184 @@ MEDICINES = [
     ("Calpol 250", "Paracetamol", "Pediatric fever", "Weight-based dosing", "Use measured pediatric dosing"),
 ]
 
+HEALTH_RESPONSE = orjson.dumps({"status": "ok", "app": "MedSetu"})
+MEDICINES_RESPONSE = b""
+MEDICINES_BY_ID = {}
+
+PROFILE_COLUMNS = {
+    "doctor": ("id", "full_name", "medical_registration_number", "specialization"),
+    "pharmacist": ("id", "full_name", "pharmacy_name", "license_number"),
+    "patient": ("id", "full_name", "mobile", "dob", "gender", "allergies", "chronic_conditions"),
+}
+
+# Statements issued on most requests. Connections are reused per thread, so
+# sqlite3's per-connection statement cache keeps these compiled.
+SQL_SESSION_USER = """
+    SELECT s.expires_at_epoch, u.id AS user_id, u.email, u.role,
+           d.id AS doctor_id, pt.id AS patient_id, ph.id AS pharmacist_id
+    FROM sessions s
+    JOIN users u ON u.id = s.user_id
+    LEFT JOIN doctors d ON d.user_id = u.id
+    LEFT JOIN patients pt ON pt.user_id = u.id
+    LEFT JOIN pharmacists ph ON ph.user_id = u.id
+    WHERE s.token = ?
+"""
+
+SQL_ACTIVE_GRANT = """
+    SELECT 1 FROM doctor_access_grants
+    WHERE doctor_id = ? AND patient_id = ? AND expires_at_epoch > ?
+    LIMIT 1
+"""
+
+SQL_INSERT_ACCESS_LOG = """
+    INSERT INTO access_logs (doctor_id, patient_id, pharmacist_id, action, success, details, created_at, expires_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+# Selected in the order of the keys returned by the pharmacist lookup, so a
+# plain tuple row can be zipped straight into the response.
+PRESCRIPTION_LOOKUP_KEYS = (
+    "prescription_id",
+    "doctor_name",
+    "doctor_reg",
+    "patient_name",
+    "patient_mobile",
+    "medicines",
+    "doctor_notes",
+    "status",
+    "created_at",
+    "dispensed_at",
+    "pharmacist_id",
+)
+
+SQL_LOOKUP_PRESCRIPTION = """
+    SELECT p.prescription_id, d.full_name, d.medical_registration_number,
+           pt.full_name, pt.mobile, p.medicines_json, p.doctor_notes, p.status,
+           p.created_at, p.dispensed_at, p.pharmacist_id
+    FROM prescriptions p
+    JOIN doctors d ON d.id = p.doctor_id
+    JOIN patients pt ON pt.id = p.patient_id
+    WHERE p.prescription_id = ?
+"""
+
+DB_LOCAL = threading.local()
+SESSION_SWEEPER = None
+SESSION_SWEEPER_LOCK = threading.Lock()
+DB_INITIALIZED = False
+DB_INIT_LOCK = threading.Lock()
+# prescription_id -> serialized lookup response, for prescriptions that can no
+# longer change. Active ones are always read fresh so a dispense handled by
+# another worker process is never hidden.
+PRESCRIPTION_CACHE = OrderedDict()
+PRESCRIPTION_CACHE_LOCK = threading.Lock()
+
 
 def get_db():
-    conn = sqlite3.connect(DB_PATH)
+    conn = sqlite3.connect(DB_PATH, cached_statements=256)
     conn.row_factory = sqlite3.Row
+    conn.executescript(
+        """
+        PRAGMA busy_timeout = 5000;
+        PRAGMA synchronous = NORMAL;
+        PRAGMA temp_store = MEMORY;
+        PRAGMA mmap_size = 268435456;
+        PRAGMA cache_size = -20000;
+        """
+    )
     return conn
 
 
+def request_db():
+    # Each worker thread keeps one connection across requests, so its page and
+    # statement caches stay warm; auth_required and the view body share it.
+    if "db" not in g:
+        conn = getattr(DB_LOCAL, "conn", None)
+        if conn is None:
+            conn = DB_LOCAL.conn = get_db()
+        g.db = conn
+    return g.db
+
+
+@app.teardown_appcontext
+def release_db(exc):
+    # Discard anything a failed request left uncommitted before the
+    # connection is reused.
+    conn = g.pop("db", None)
+    if conn is not None and conn.in_transaction:
+        conn.rollback()
+
+
+@contextmanager
+def write_transaction(conn):
+    # BEGIN IMMEDIATE takes the write lock up front so a read-then-write
+    # sequence cannot fail on lock upgrade; the block commits once on exit.
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except BaseException:
+        conn.rollback()
+        raise
+    conn.commit()
+
+
 def now_iso():
-    return datetime.utcnow().replace(microsecond=0).isoformat() + "Z"
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+
+
+def hash_password(password):
+    if PASSWORD_HASHER:
+        return PASSWORD_HASHER.hash(password)
+    # Use PBKDF2 for compatibility with environments missing hashlib.scrypt.
+    return generate_password_hash(password, method=f"pbkdf2:sha256:{PBKDF2_ITERATIONS}")
+
+
+def verify_password(password_hash, password):
+    # Hashes are self-describing, so argon2 and legacy PBKDF2 rows can coexist.
+    if password_hash.startswith("$argon2"):
+        if not PASSWORD_HASHER:
+            return False
+        try:
+            return PASSWORD_HASHER.verify(password_hash, password)
+        except (InvalidHashError, VerificationError):
+            return False
+    return check_password_hash(password_hash, password)
+
+
+def new_ulid():
+    # 48-bit millisecond timestamp followed by 80 random bits, written in
+    # Crockford base32, so ids generated later sort after earlier ones.
+    value = (time.time_ns() // 1_000_000) << 80 | int.from_bytes(os.urandom(10), "big")
+    chars = []
+    for _ in range(26):
+        chars.append(ULID_ALPHABET[value & 31])
+        value >>= 5
+    return "".join(reversed(chars))
 
 
-def parse_iso(value):
-    return datetime.fromisoformat(value.replace("Z", ""))
+def to_epoch(value):
+    return calendar.timegm(value.utctimetuple())
 
 
 def init_db():
+    global DB_INITIALIZED
+    with DB_INIT_LOCK:
+        if not DB_INITIALIZED:
+            setup_db()
+            DB_INITIALIZED = True
+
+
+def setup_db():
     with closing(get_db()) as conn:
+        # WAL lets readers proceed while a writer holds the lock; it is a
+        # persistent property of the database file, so set it once here.
+        if str(DB_PATH) != ":memory:":
+            conn.execute("PRAGMA journal_mode = WAL")
+        # Schema, migrations and seed data go in one write transaction, so
+        # several workers starting at once apply them one after another.
         conn.executescript(
             """
+            BEGIN IMMEDIATE;
+
             CREATE TABLE IF NOT EXISTS users (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 email TEXT UNIQUE NOT NULL,
@@ -157,6 +362,7 @@ def init_db():
                 otp_code TEXT NOT NULL,
                 created_at TEXT NOT NULL,
                 expires_at TEXT NOT NULL,
+                expires_at_epoch INTEGER,
                 verified_at TEXT,
                 FOREIGN KEY (patient_id) REFERENCES patients(id),
                 FOREIGN KEY (doctor_id) REFERENCES doctors(id)
@@ -169,6 +375,7 @@ def init_db():
                 otp_id INTEGER NOT NULL,
                 granted_at TEXT NOT NULL,
                 expires_at TEXT NOT NULL,
+                expires_at_epoch INTEGER,
                 FOREIGN KEY (doctor_id) REFERENCES doctors(id),
                 FOREIGN KEY (patient_id) REFERENCES patients(id),
                 FOREIGN KEY (otp_id) REFERENCES patient_otps(id)
@@ -180,6 +387,8 @@ def init_db():
                 uploader_user_id INTEGER NOT NULL,
                 file_name TEXT NOT NULL,
                 file_path TEXT NOT NULL,
+                file_dir TEXT,
+                file_basename TEXT,
                 uploaded_at TEXT NOT NULL,
                 FOREIGN KEY (patient_id) REFERENCES patients(id),
                 FOREIGN KEY (uploader_user_id) REFERENCES users(id)
@@ -190,6 +399,8 @@ def init_db():
                 patient_id INTEGER NOT NULL,
                 file_name TEXT NOT NULL,
                 file_path TEXT NOT NULL,
+                file_dir TEXT,
+                file_basename TEXT,
                 uploaded_at TEXT NOT NULL,
                 FOREIGN KEY (patient_id) REFERENCES patients(id)
             );
@@ -199,34 +410,114 @@ def init_db():
                 user_id INTEGER NOT NULL,
                 role TEXT NOT NULL,
                 expires_at TEXT NOT NULL,
+                expires_at_epoch INTEGER,
                 created_at TEXT NOT NULL,
                 FOREIGN KEY (user_id) REFERENCES users(id)
             );
+
+            CREATE TRIGGER IF NOT EXISTS trg_log_otp_sent AFTER INSERT ON patient_otps
+            BEGIN
+                INSERT INTO access_logs (doctor_id, patient_id, action, success, details, created_at, expires_at)
+                VALUES (NEW.doctor_id, NEW.patient_id, 'OTP_SENT', 1, 'Simulated OTP sent', NEW.created_at, NEW.expires_at);
+            END;
+
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_medicines_brand ON medicines(brand_name);
+            CREATE INDEX IF NOT EXISTS idx_otp_pt_dr_id ON patient_otps(patient_id, doctor_id, id DESC);
+            CREATE INDEX IF NOT EXISTS idx_rx_patient_created_id ON prescriptions(patient_id, created_at DESC, prescription_id DESC);
+            CREATE INDEX IF NOT EXISTS idx_reports_patient_uploaded_id ON uploaded_reports(patient_id, uploaded_at DESC, id DESC);
+            CREATE INDEX IF NOT EXISTS idx_ext_patient_uploaded ON external_prescriptions(patient_id, uploaded_at DESC);
+            CREATE INDEX IF NOT EXISTS idx_logs_patient_created ON access_logs(patient_id, created_at DESC);
             """
         )
 
-        cur = conn.execute("SELECT COUNT(*) AS c FROM medicines")
-        if cur.fetchone()["c"] == 0:
-            conn.executemany(
-                """
-                INSERT INTO medicines (brand_name, generic_name, indications, standard_dosage, precautions)
-                VALUES (?, ?, ?, ?, ?)
-                """,
-                MEDICINES,
-            )
+        # Expiry checks compare integer epochs; add and backfill the column on
+        # databases created before it existed.
+        for table in ("sessions", "patient_otps", "doctor_access_grants"):
+            columns = {r["name"] for r in conn.execute(f"PRAGMA table_info({table})")}
+            if "expires_at_epoch" not in columns:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN expires_at_epoch INTEGER")
+                conn.execute(f"UPDATE {table} SET expires_at_epoch = CAST(strftime('%s', expires_at) AS INTEGER)")
+        # Downloads read the stored folder and name directly instead of
+        # splitting file_path on every request.
+        for table in ("uploaded_reports", "external_prescriptions"):
+            columns = {r["name"] for r in conn.execute(f"PRAGMA table_info({table})")}
+            if "file_dir" not in columns:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN file_dir TEXT")
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN file_basename TEXT")
+                conn.executemany(
+                    f"UPDATE {table} SET file_dir = ?, file_basename = ? WHERE id = ?",
+                    [(*os.path.split(r["file_path"]), r["id"]) for r in conn.execute(f"SELECT id, file_path FROM {table}")],
+                )
+        # Created after the migration above, since older databases only gain
+        # expires_at_epoch there.
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_grant_dr_pt_exp ON doctor_access_grants(doctor_id, patient_id, expires_at_epoch)"
+        )
+
+        conn.executemany(
+            """
+            INSERT OR IGNORE INTO medicines (brand_name, generic_name, indications, standard_dosage, precautions)
+            VALUES (?, ?, ?, ?, ?)
+            """,
+            MEDICINES,
+        )
+        conn.commit()
+
+        # The medicines table is seed data, so its response body and the
+        # id lookup used by create_prescription never change.
+        global MEDICINES_RESPONSE, MEDICINES_BY_ID
+        rows = [dict(r) for r in conn.execute("SELECT * FROM medicines ORDER BY brand_name")]
+        MEDICINES_RESPONSE = orjson.dumps({"medicines": rows})
+        MEDICINES_BY_ID = {r["id"]: r for r in rows}
+
+
+def sweep_expired_sessions():
+    with closing(get_db()) as conn:
+        conn.execute("DELETE FROM sessions WHERE expires_at_epoch < ?", (int(time.time()),))
         conn.commit()
 
 
+def optimize_db():
+    # 0x10002 checks every table, not only those this fresh connection has
+    # queried. Tables are only re-analyzed once they already have stale
+    # statistics; without any, the planner's defaults pick the right indexes.
+    with closing(get_db()) as conn:
+        conn.execute("PRAGMA analysis_limit = 1000")
+        conn.execute("PRAGMA optimize(0x10002)")
+
+
+def run_session_sweeper():
+    while True:
+        try:
+            sweep_expired_sessions()
+            optimize_db()
+        except sqlite3.Error:
+            app.logger.exception("Expired session sweep failed")
+        time.sleep(SESSION_SWEEP_SECONDS)
+
+
+@app.before_request
+def start_session_sweeper():
+    # Expired sessions are purged in the background so auth_required never
+    # writes. Started lazily so each forked worker runs its own sweeper.
+    global SESSION_SWEEPER
+    if SESSION_SWEEPER is None:
+        with SESSION_SWEEPER_LOCK:
+            if SESSION_SWEEPER is None:
+                SESSION_SWEEPER = threading.Thread(target=run_session_sweeper, name="session-sweeper", daemon=True)
+                SESSION_SWEEPER.start()
+
+
 def create_session(user_id, role):
     token = secrets.token_urlsafe(32)
     now = datetime.utcnow()
     expires = now + timedelta(hours=SESSION_HOURS)
-    with closing(get_db()) as conn:
-        conn.execute(
-            "INSERT INTO sessions (token, user_id, role, expires_at, created_at) VALUES (?, ?, ?, ?, ?)",
-            (token, user_id, role, expires.isoformat() + "Z", now.isoformat() + "Z"),
-        )
-        conn.commit()
+    conn = request_db()
+    conn.execute(
+        "INSERT INTO sessions (token, user_id, role, expires_at, expires_at_epoch, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+        (token, user_id, role, expires.isoformat() + "Z", to_epoch(expires), now.isoformat() + "Z"),
+    )
+    conn.commit()
     return token, expires.isoformat() + "Z"
 
 
@@ -238,25 +529,25 @@ def auth_required(role=None):
             if not header.startswith("Bearer "):
                 return jsonify({"error": "Missing bearer token"}), 401
             token = header.split(" ", 1)[1]
-            with closing(get_db()) as conn:
-                session = conn.execute(
-                    "SELECT * FROM sessions WHERE token = ?", (token,)
-                ).fetchone()
-                if not session:
-                    return jsonify({"error": "Invalid session"}), 401
-                if parse_iso(session["expires_at"]) < datetime.utcnow():
-                    conn.execute("DELETE FROM sessions WHERE token = ?", (token,))
-                    conn.commit()
-                    return jsonify({"error": "Session expired"}), 401
-
-                user = conn.execute("SELECT * FROM users WHERE id = ?", (session["user_id"],)).fetchone()
-                if not user:
-                    return jsonify({"error": "User not found"}), 401
-
-                if role and user["role"] != role:
-                    return jsonify({"error": "Forbidden"}), 403
-
-                request.current_user = dict(user)
+            conn = request_db()
+            session = conn.execute(SQL_SESSION_USER, (token,)).fetchone()
+            if not session:
+                return jsonify({"error": "Invalid session"}), 401
+            if session["expires_at_epoch"] < time.time():
+                return jsonify({"error": "Session expired"}), 401
+
+            if role and session["role"] != role:
+                return jsonify({"error": "Forbidden"}), 403
+
+            # The role's profile id rides along so handlers need no extra lookup.
+            request.current_user = {
+                "id": session["user_id"],
+                "email": session["email"],
+                "role": session["role"],
+                "doctor_id": session["doctor_id"],
+                "patient_id": session["patient_id"],
+                "pharmacist_id": session["pharmacist_id"],
+            }
             return fn(*args, **kwargs)
 
         return wrapped
@@ -264,38 +555,74 @@ def auth_required(role=None):
     return decorator
 
 
-def doctor_record(conn, user_id):
-    return conn.execute("SELECT * FROM doctors WHERE user_id = ?", (user_id,)).fetchone()
+def doctor_record(conn, user_id, columns):
+    return conn.execute(f"SELECT {columns} FROM doctors WHERE user_id = ?", (user_id,)).fetchone()
 
 
-def patient_record(conn, user_id):
-    return conn.execute("SELECT * FROM patients WHERE user_id = ?", (user_id,)).fetchone()
+def patient_record(conn, user_id, columns):
+    return conn.execute(f"SELECT {columns} FROM patients WHERE user_id = ?", (user_id,)).fetchone()
 
 
-def pharmacist_record(conn, user_id):
-    return conn.execute("SELECT * FROM pharmacists WHERE user_id = ?", (user_id,)).fetchone()
+def pharmacist_record(conn, user_id, columns):
+    return conn.execute(f"SELECT {columns} FROM pharmacists WHERE user_id = ?", (user_id,)).fetchone()
 
 
 def has_doctor_access(conn, doctor_id, patient_id):
-    grant = conn.execute(
-        """
-        SELECT * FROM doctor_access_grants
-        WHERE doctor_id = ? AND patient_id = ?
-        ORDER BY id DESC LIMIT 1
-        """,
-        (doctor_id, patient_id),
-    ).fetchone()
-    if not grant:
-        return False
-    return parse_iso(grant["expires_at"]) > datetime.utcnow()
+    grant = conn.execute(SQL_ACTIVE_GRANT, (doctor_id, patient_id, int(time.time()))).fetchone()
+    return grant is not None
+
+
+def upload_fileno(stream):
+    # Werkzeug spools uploads in a SpooledTemporaryFile that only becomes a
+    # real file once it grows past its in-memory limit, and calling fileno()
+    # on it would force that rollover. SpooledTemporaryFile has no public way
+    # to ask whether it rolled over, so as a compatibility guard look at the
+    # wrapped file and treat anything that is not an OS-level file as
+    # in-memory.
+    if isinstance(stream, tempfile.SpooledTemporaryFile):
+        stream = getattr(stream, "_file", None)
+    if not isinstance(stream, (io.BufferedRandom, io.BufferedReader, io.FileIO)):
+        return None
+    return stream.fileno()
+
+
+def save_upload(file, path):
+    # Uploads already on disk are copied by the kernel; file-to-file sendfile
+    # is Linux-only, so everything else is one large-buffer copy.
+    src = file.stream
+    start = src.tell()
+    with open(path, "wb") as dst:
+        src_fd = upload_fileno(src) if sys.platform.startswith("linux") else None
+        if src_fd is not None:
+            try:
+                offset = start
+                size = os.fstat(src_fd).st_size
+                while offset < size:
+                    sent = os.sendfile(dst.fileno(), src_fd, offset, size - offset)
+                    if not sent:
+                        break
+                    offset += sent
+                return
+            except OSError:
+                src.seek(start)
+                dst.seek(0)
+                dst.truncate()
+        shutil.copyfileobj(src, dst, UPLOAD_CHUNK_SIZE)
+
+
+def send_upload(folder, filename, download_name):
+    if X_ACCEL_REDIRECT_PREFIX:
+        relative = Path(folder, filename).relative_to(UPLOAD_DIR).as_posix()
+        response = Response(mimetype=mimetypes.guess_type(download_name)[0] or "application/octet-stream")
+        response.headers["X-Accel-Redirect"] = X_ACCEL_REDIRECT_PREFIX.rstrip("/") + "/" + relative
+        response.headers.set("Content-Disposition", "attachment", filename=download_name)
+        return response
+    return send_from_directory(folder, filename, as_attachment=True, download_name=download_name)
 
 
 def log_action(conn, action, success=1, doctor_id=None, patient_id=None, pharmacist_id=None, details=None, expires_at=None):
     conn.execute(
-        """
-        INSERT INTO access_logs (doctor_id, patient_id, pharmacist_id, action, success, details, created_at, expires_at)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        """,
+        SQL_INSERT_ACCESS_LOG,
         (doctor_id, patient_id, pharmacist_id, action, success, details, now_iso(), expires_at),
     )
 
@@ -307,7 +634,7 @@ def home():
 
 @app.route("/health")
 def health():
-    return jsonify({"status": "ok", "app": "MedSetu"})
+    return Response(HEALTH_RESPONSE, mimetype="application/json")
 
 
 @app.post("/api/register")
@@ -324,66 +651,65 @@ def register():
         return jsonify({"error": "Missing required fields"}), 400
 
     try:
-        with closing(get_db()) as conn:
-            # Use PBKDF2 for compatibility with environments missing hashlib.scrypt.
-            password_hash = generate_password_hash(password, method="pbkdf2:sha256")
-            cur = conn.execute(
-                "INSERT INTO users (email, password_hash, role, created_at) VALUES (?, ?, ?, ?)",
-                (email, password_hash, role, now_iso()),
+        conn = request_db()
+        password_hash = hash_password(password)
+        cur = conn.execute(
+            "INSERT INTO users (email, password_hash, role, created_at) VALUES (?, ?, ?, ?)",
+            (email, password_hash, role, now_iso()),
+        )
+        user_id = cur.lastrowid
+
+        if role == "doctor":
+            reg = (data.get("medical_registration_number") or "").strip()
+            spec = (data.get("specialization") or "").strip()
+            if not reg:
+                raise ValueError("Medical registration number is required")
+            conn.execute(
+                """
+                INSERT INTO doctors (user_id, full_name, medical_registration_number, specialization)
+                VALUES (?, ?, ?, ?)
+                """,
+                (user_id, full_name, reg, spec),
+            )
+        elif role == "pharmacist":
+            lic = (data.get("license_number") or "").strip()
+            pharmacy = (data.get("pharmacy_name") or "").strip()
+            if not lic:
+                raise ValueError("Pharmacy license number is required")
+            conn.execute(
+                """
+                INSERT INTO pharmacists (user_id, full_name, pharmacy_name, license_number)
+                VALUES (?, ?, ?, ?)
+                """,
+                (user_id, full_name, pharmacy, lic),
+            )
+        else:
+            mobile = (data.get("mobile") or "").strip()
+            dob = (data.get("dob") or "").strip()
+            gender = (data.get("gender") or "").strip()
+            allergies = data.get("allergies") or []
+            chronic_conditions = data.get("chronic_conditions") or []
+            if not mobile:
+                raise ValueError("Mobile number is required")
+            conn.execute(
+                """
+                INSERT INTO patients (user_id, full_name, mobile, dob, gender, allergies, chronic_conditions)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    user_id,
+                    full_name,
+                    mobile,
+                    dob,
+                    gender,
+                    orjson.dumps(allergies).decode(),
+                    orjson.dumps(chronic_conditions).decode(),
+                ),
             )
-            user_id = cur.lastrowid
-
-            if role == "doctor":
-                reg = (data.get("medical_registration_number") or "").strip()
-                spec = (data.get("specialization") or "").strip()
-                if not reg:
-                    raise ValueError("Medical registration number is required")
-                conn.execute(
-                    """
-                    INSERT INTO doctors (user_id, full_name, medical_registration_number, specialization)
-                    VALUES (?, ?, ?, ?)
-                    """,
-                    (user_id, full_name, reg, spec),
-                )
-            elif role == "pharmacist":
-                lic = (data.get("license_number") or "").strip()
-                pharmacy = (data.get("pharmacy_name") or "").strip()
-                if not lic:
-                    raise ValueError("Pharmacy license number is required")
-                conn.execute(
-                    """
-                    INSERT INTO pharmacists (user_id, full_name, pharmacy_name, license_number)
-                    VALUES (?, ?, ?, ?)
-                    """,
-                    (user_id, full_name, pharmacy, lic),
-                )
-            else:
-                mobile = (data.get("mobile") or "").strip()
-                dob = (data.get("dob") or "").strip()
-                gender = (data.get("gender") or "").strip()
-                allergies = data.get("allergies") or []
-                chronic_conditions = data.get("chronic_conditions") or []
-                if not mobile:
-                    raise ValueError("Mobile number is required")
-                conn.execute(
-                    """
-                    INSERT INTO patients (user_id, full_name, mobile, dob, gender, allergies, chronic_conditions)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                    """,
-                    (
-                        user_id,
-                        full_name,
-                        mobile,
-                        dob,
-                        gender,
-                        json.dumps(allergies),
-                        json.dumps(chronic_conditions),
-                    ),
-                )
 
-            conn.commit()
-            token, expires = create_session(user_id, role)
-            return jsonify({"message": "Registered", "token": token, "session_expires_at": expires, "role": role})
+        conn.commit()
+        token, expires = create_session(user_id, role)
+        return jsonify({"message": "Registered", "token": token, "session_expires_at": expires, "role": role})
     except sqlite3.IntegrityError:
         return jsonify({"error": "Email/mobile/license/registration already exists"}), 409
     except ValueError as e:
@@ -399,26 +725,26 @@ def login():
     if not email or not password:
         return jsonify({"error": "Email and password are required"}), 400
 
-    with closing(get_db()) as conn:
-        user = conn.execute("SELECT * FROM users WHERE email = ?", (email,)).fetchone()
-        if not user or not check_password_hash(user["password_hash"], password):
-            return jsonify({"error": "Invalid credentials"}), 401
-
-        if user["role"] == "doctor":
-            reg = (data.get("medical_registration_number") or "").strip()
-            if not reg:
-                return jsonify({"error": "Medical registration number is mandatory for doctor login"}), 400
-            doctor = doctor_record(conn, user["id"])
-            if not doctor or doctor["medical_registration_number"] != reg:
-                return jsonify({"error": "Invalid medical registration number"}), 401
-
-        if user["role"] == "pharmacist":
-            lic = (data.get("license_number") or "").strip()
-            if not lic:
-                return jsonify({"error": "Pharmacy license number is mandatory for pharmacist login"}), 400
-            pharmacist = pharmacist_record(conn, user["id"])
-            if not pharmacist or pharmacist["license_number"] != lic:
-                return jsonify({"error": "Invalid pharmacy license number"}), 401
+    conn = request_db()
+    user = conn.execute("SELECT id, email, password_hash, role FROM users WHERE email = ?", (email,)).fetchone()
+    if not user or not verify_password(user["password_hash"], password):
+        return jsonify({"error": "Invalid credentials"}), 401
+
+    if user["role"] == "doctor":
+        reg = (data.get("medical_registration_number") or "").strip()
+        if not reg:
+            return jsonify({"error": "Medical registration number is mandatory for doctor login"}), 400
+        doctor = doctor_record(conn, user["id"], "medical_registration_number")
+        if not doctor or not secrets.compare_digest(doctor["medical_registration_number"].encode(), reg.encode()):
+            return jsonify({"error": "Invalid medical registration number"}), 401
+
+    if user["role"] == "pharmacist":
+        lic = (data.get("license_number") or "").strip()
+        if not lic:
+            return jsonify({"error": "Pharmacy license number is mandatory for pharmacist login"}), 400
+        pharmacist = pharmacist_record(conn, user["id"], "license_number")
+        if not pharmacist or not secrets.compare_digest(pharmacist["license_number"].encode(), lic.encode()):
+            return jsonify({"error": "Invalid pharmacy license number"}), 401
 
     token, expires = create_session(user["id"], user["role"])
     return jsonify(
@@ -437,9 +763,9 @@ def login():
 def logout():
     header = request.headers.get("Authorization", "")
     token = header.split(" ", 1)[1]
-    with closing(get_db()) as conn:
-        conn.execute("DELETE FROM sessions WHERE token = ?", (token,))
-        conn.commit()
+    conn = request_db()
+    conn.execute("DELETE FROM sessions WHERE token = ?", (token,))
+    conn.commit()
     return jsonify({"message": "Logged out"})
 
 
@@ -447,26 +773,22 @@ def logout():
 @auth_required()
 def me():
     user = request.current_user
-    with closing(get_db()) as conn:
-        profile = {}
-        if user["role"] == "doctor":
-            d = doctor_record(conn, user["id"])
-            profile = dict(d) if d else {}
-        elif user["role"] == "pharmacist":
-            p = pharmacist_record(conn, user["id"])
-            profile = dict(p) if p else {}
-        else:
-            pt = patient_record(conn, user["id"])
-            profile = dict(pt) if pt else {}
-        return jsonify({"user": {"id": user["id"], "email": user["email"], "role": user["role"]}, "profile": profile})
+    conn = request_db()
+    columns = PROFILE_COLUMNS[user["role"]]
+    if user["role"] == "doctor":
+        row = doctor_record(conn, user["id"], ", ".join(columns))
+    elif user["role"] == "pharmacist":
+        row = pharmacist_record(conn, user["id"], ", ".join(columns))
+    else:
+        row = patient_record(conn, user["id"], ", ".join(columns))
+    profile = dict(zip(columns, row)) if row else {}
+    return jsonify({"user": {"id": user["id"], "email": user["email"], "role": user["role"]}, "profile": profile})
 
 
 @app.get("/api/medicines")
 @auth_required()
 def medicines():
-    with closing(get_db()) as conn:
-        rows = conn.execute("SELECT * FROM medicines ORDER BY brand_name").fetchall()
-        return jsonify({"medicines": [dict(r) for r in rows]})
+    return Response(MEDICINES_RESPONSE, mimetype="application/json")
 
 
 @app.get("/api/doctor/patients/search")
@@ -476,21 +798,21 @@ def doctor_search_patient():
     if not mobile:
         return jsonify({"error": "mobile query param required"}), 400
 
-    with closing(get_db()) as conn:
-        patient = conn.execute("SELECT * FROM patients WHERE mobile = ?", (mobile,)).fetchone()
-        if not patient:
-            return jsonify({"error": "Patient not found"}), 404
-        return jsonify(
-            {
-                "patient": {
-                    "id": patient["id"],
-                    "full_name": patient["full_name"],
-                    "mobile": patient["mobile"],
-                    "dob": patient["dob"],
-                    "gender": patient["gender"],
-                }
+    conn = request_db()
+    patient = conn.execute("SELECT id, full_name, mobile, dob, gender FROM patients WHERE mobile = ?", (mobile,)).fetchone()
+    if not patient:
+        return jsonify({"error": "Patient not found"}), 404
+    return jsonify(
+        {
+            "patient": {
+                "id": patient["id"],
+                "full_name": patient["full_name"],
+                "mobile": patient["mobile"],
+                "dob": patient["dob"],
+                "gender": patient["gender"],
             }
-        )
+        }
+    )
 
 
 @app.post("/api/doctor/access/send-otp")
@@ -501,41 +823,33 @@ def send_otp():
     if not patient_id:
         return jsonify({"error": "patient_id is required"}), 400
 
-    with closing(get_db()) as conn:
-        doctor = doctor_record(conn, request.current_user["id"])
-        patient = conn.execute("SELECT * FROM patients WHERE id = ?", (patient_id,)).fetchone()
-        if not doctor or not patient:
-            return jsonify({"error": "Doctor/patient not found"}), 404
+    conn = request_db()
+    doctor_id = request.current_user["doctor_id"]
+    patient = conn.execute("SELECT id FROM patients WHERE id = ?", (patient_id,)).fetchone()
+    if not doctor_id or not patient:
+        return jsonify({"error": "Doctor/patient not found"}), 404
 
-        otp = f"{secrets.randbelow(1000000):06d}"
-        expires = datetime.utcnow() + timedelta(minutes=ACCESS_WINDOW_MINUTES)
+    otp = f"{secrets.randbelow(1000000):06d}"
+    expires = datetime.utcnow() + timedelta(minutes=ACCESS_WINDOW_MINUTES)
 
-        conn.execute(
-            """
-            INSERT INTO patient_otps (patient_id, doctor_id, otp_code, created_at, expires_at)
-            VALUES (?, ?, ?, ?, ?)
-            """,
-            (patient_id, doctor["id"], otp, now_iso(), expires.isoformat() + "Z"),
-        )
-        log_action(
-            conn,
-            action="OTP_SENT",
-            success=1,
-            doctor_id=doctor["id"],
-            patient_id=patient_id,
-            details="Simulated OTP sent",
-            expires_at=expires.isoformat() + "Z",
-        )
-        conn.commit()
+    # The OTP_SENT access log row is written by the trg_log_otp_sent trigger.
+    conn.execute(
+        """
+        INSERT INTO patient_otps (patient_id, doctor_id, otp_code, created_at, expires_at, expires_at_epoch)
+        VALUES (?, ?, ?, ?, ?, ?)
+        """,
+        (patient_id, doctor_id, otp, now_iso(), expires.isoformat() + "Z", to_epoch(expires)),
+    )
+    conn.commit()
 
-        return jsonify(
-            {
-                "message": "OTP generated (simulation)",
-                "otp": otp,
-                "expires_at": expires.isoformat() + "Z",
-                "valid_for_minutes": ACCESS_WINDOW_MINUTES,
-            }
-        )
+    return jsonify(
+        {
+            "message": "OTP generated (simulation)",
+            "otp": otp,
+            "expires_at": expires.isoformat() + "Z",
+            "valid_for_minutes": ACCESS_WINDOW_MINUTES,
+        }
+    )
 
 
 @app.post("/api/doctor/access/verify-otp")
@@ -548,29 +862,28 @@ def verify_otp():
     if not patient_id or not otp_code:
         return jsonify({"error": "patient_id and otp_code are required"}), 400
 
-    with closing(get_db()) as conn:
-        doctor = doctor_record(conn, request.current_user["id"])
+    conn = request_db()
+    doctor_id = request.current_user["doctor_id"]
+    with write_transaction(conn):
         otp = conn.execute(
             """
-            SELECT * FROM patient_otps
+            SELECT id, otp_code, expires_at_epoch, verified_at FROM patient_otps
             WHERE patient_id = ? AND doctor_id = ?
             ORDER BY id DESC
             LIMIT 1
             """,
-            (patient_id, doctor["id"]),
+            (patient_id, doctor_id),
         ).fetchone()
 
         if not otp:
             return jsonify({"error": "OTP not found"}), 404
         if otp["verified_at"] is not None:
             return jsonify({"error": "OTP already used"}), 400
-        if parse_iso(otp["expires_at"]) < datetime.utcnow():
-            log_action(conn, "OTP_VERIFY", success=0, doctor_id=doctor["id"], patient_id=patient_id, details="OTP expired")
-            conn.commit()
+        if otp["expires_at_epoch"] < time.time():
+            log_action(conn, "OTP_VERIFY", success=0, doctor_id=doctor_id, patient_id=patient_id, details="OTP expired")
             return jsonify({"error": "OTP expired"}), 400
-        if otp["otp_code"] != otp_code:
-            log_action(conn, "OTP_VERIFY", success=0, doctor_id=doctor["id"], patient_id=patient_id, details="OTP mismatch")
-            conn.commit()
+        if not secrets.compare_digest(otp["otp_code"].encode(), otp_code.encode()):
+            log_action(conn, "OTP_VERIFY", success=0, doctor_id=doctor_id, patient_id=patient_id, details="OTP mismatch")
             return jsonify({"error": "Invalid OTP"}), 400
 
         now = datetime.utcnow()
@@ -579,51 +892,110 @@ def verify_otp():
         conn.execute("UPDATE patient_otps SET verified_at = ? WHERE id = ?", (now_iso(), otp["id"]))
         conn.execute(
             """
-            INSERT INTO doctor_access_grants (doctor_id, patient_id, otp_id, granted_at, expires_at)
-            VALUES (?, ?, ?, ?, ?)
+            INSERT INTO doctor_access_grants (doctor_id, patient_id, otp_id, granted_at, expires_at, expires_at_epoch)
+            VALUES (?, ?, ?, ?, ?, ?)
             """,
-            (doctor["id"], patient_id, otp["id"], now.isoformat() + "Z", expiry.isoformat() + "Z"),
+            (doctor_id, patient_id, otp["id"], now.isoformat() + "Z", expiry.isoformat() + "Z", to_epoch(expiry)),
         )
         log_action(
             conn,
             action="OTP_VERIFY",
             success=1,
-            doctor_id=doctor["id"],
+            doctor_id=doctor_id,
             patient_id=patient_id,
             details="Patient access granted",
             expires_at=expiry.isoformat() + "Z",
         )
-        conn.commit()
-
-        return jsonify({"message": "OTP verified", "access_expires_at": expiry.isoformat() + "Z"})
-
 
-def get_patient_overview(conn, patient_id):
-    patient = conn.execute("SELECT * FROM patients WHERE id = ?", (patient_id,)).fetchone()
-    if not patient:
-        return None
-
-    prescriptions = conn.execute(
-        """
-        SELECT p.*, d.full_name as doctor_name, d.medical_registration_number
+    return jsonify({"message": "OTP verified", "access_expires_at": expiry.isoformat() + "Z"})
+
+
+def overview_prescriptions(conn, patient_id, limit, before=None):
+    # Keyset paging on (created_at, prescription_id), the order of
+    # idx_rx_patient_created_id, so later pages cost the same as the first and
+    # rows inserted meanwhile neither repeat nor get skipped. The list
+    # queries return plain tuples unpacked positionally, avoiding a name
+    # lookup into sqlite3.Row per column.
+    keyset = "AND (p.created_at, p.prescription_id) < (?, ?)" if before else ""
+    cur = conn.cursor()
+    cur.row_factory = None
+    rows = cur.execute(
+        f"""
+        SELECT p.prescription_id, p.doctor_id, p.medicines_json, p.doctor_notes, p.status,
+               p.created_at, p.dispensed_at, d.full_name as doctor_name, d.medical_registration_number
         FROM prescriptions p
         JOIN doctors d ON d.id = p.doctor_id
-        WHERE p.patient_id = ?
-        ORDER BY p.created_at DESC
+        WHERE p.patient_id = ? {keyset}
+        ORDER BY p.created_at DESC, p.prescription_id DESC
+        LIMIT ?
         """,
-        (patient_id,),
+        (patient_id, *(before or ()), limit + 1),
     ).fetchall()
 
-    reports = conn.execute(
-        """
+    # One extra row is fetched to tell whether another page exists.
+    next_cursor = [rows[limit - 1][5], rows[limit - 1][0]] if len(rows) > limit else None
+    # Stored medicines JSON is embedded verbatim rather than parsed and re-encoded.
+    prescriptions = [
+        {
+            "prescription_id": prescription_id,
+            "doctor_id": doctor_id,
+            "doctor_name": doctor_name,
+            "doctor_reg_no": doctor_reg_no,
+            "medicines": orjson.Fragment(medicines_json),
+            "doctor_notes": doctor_notes,
+            "status": status,
+            "created_at": created_at,
+            "dispensed_at": dispensed_at,
+        }
+        for (
+            prescription_id,
+            doctor_id,
+            medicines_json,
+            doctor_notes,
+            status,
+            created_at,
+            dispensed_at,
+            doctor_name,
+            doctor_reg_no,
+        ) in rows[:limit]
+    ]
+    return prescriptions, next_cursor
+
+
+def overview_reports(conn, patient_id, limit, before=None):
+    # Keyset paging on (uploaded_at, id), the order of idx_reports_patient_uploaded_id.
+    keyset = "AND (uploaded_at, id) < (?, ?)" if before else ""
+    cur = conn.cursor()
+    cur.row_factory = None
+    rows = cur.execute(
+        f"""
         SELECT id, file_name, uploaded_at
         FROM uploaded_reports
-        WHERE patient_id = ?
-        ORDER BY uploaded_at DESC
+        WHERE patient_id = ? {keyset}
+        ORDER BY uploaded_at DESC, id DESC
+        LIMIT ?
         """,
-        (patient_id,),
+        (patient_id, *(before or ()), limit + 1),
     ).fetchall()
 
+    next_cursor = [rows[limit - 1][2], rows[limit - 1][0]] if len(rows) > limit else None
+    reports = [
+        {"id": report_id, "file_name": file_name, "uploaded_at": uploaded_at}
+        for report_id, file_name, uploaded_at in rows[:limit]
+    ]
+    return reports, next_cursor
+
+
+def get_patient_overview(conn, patient_id, limit=OVERVIEW_PAGE_SIZE):
+    patient = conn.execute(
+        "SELECT id, full_name, mobile, dob, gender, allergies, chronic_conditions FROM patients WHERE id = ?",
+        (patient_id,),
+    ).fetchone()
+    if not patient:
+        return None
+
+    prescriptions, next_prescriptions_cursor = overview_prescriptions(conn, patient_id, limit)
+    reports, next_reports_cursor = overview_reports(conn, patient_id, limit)
     return {
         "profile": {
             "id": patient["id"],
@@ -631,44 +1003,58 @@ def get_patient_overview(conn, patient_id):
             "mobile": patient["mobile"],
             "dob": patient["dob"],
             "gender": patient["gender"],
-            "allergies": json.loads(patient["allergies"] or "[]"),
-            "chronic_conditions": json.loads(patient["chronic_conditions"] or "[]"),
+            "allergies": orjson.Fragment(patient["allergies"] or "[]"),
+            "chronic_conditions": orjson.Fragment(patient["chronic_conditions"] or "[]"),
         },
-        "prescriptions": [
-            {
-                "prescription_id": p["prescription_id"],
-                "doctor_id": p["doctor_id"],
-                "doctor_name": p["doctor_name"],
-                "doctor_reg_no": p["medical_registration_number"],
-                "medicines": json.loads(p["medicines_json"]),
-                "doctor_notes": p["doctor_notes"],
-                "status": p["status"],
-                "created_at": p["created_at"],
-                "dispensed_at": p["dispensed_at"],
-            }
-            for p in prescriptions
-        ],
-        "reports": [dict(r) for r in reports],
+        "prescriptions": prescriptions,
+        "reports": reports,
+        "next_prescriptions_cursor": next_prescriptions_cursor,
+        "next_reports_cursor": next_reports_cursor,
     }
 
 
 @app.get("/api/doctor/patient/<int:patient_id>/overview")
 @auth_required("doctor")
 def doctor_patient_overview(patient_id):
-    with closing(get_db()) as conn:
-        doctor = doctor_record(conn, request.current_user["id"])
-        if not has_doctor_access(conn, doctor["id"], patient_id):
-            log_action(conn, "PATIENT_OVERVIEW", success=0, doctor_id=doctor["id"], patient_id=patient_id, details="No active access")
-            conn.commit()
-            return jsonify({"error": "Access denied. OTP verification required or expired."}), 403
+    conn = request_db()
+    doctor_id = request.current_user["doctor_id"]
+    if not has_doctor_access(conn, doctor_id, patient_id):
+        log_action(conn, "PATIENT_OVERVIEW", success=0, doctor_id=doctor_id, patient_id=patient_id, details="No active access")
+        conn.commit()
+        return jsonify({"error": "Access denied. OTP verification required or expired."}), 403
+
+    limit = min(max(request.args.get("limit", OVERVIEW_PAGE_SIZE, type=int), 1), OVERVIEW_MAX_PAGE_SIZE)
+    payload = get_patient_overview(conn, patient_id, limit)
+    if not payload:
+        return jsonify({"error": "Patient not found"}), 404
+
+    log_action(conn, "PATIENT_OVERVIEW", success=1, doctor_id=doctor_id, patient_id=patient_id, details="Overview viewed")
+    conn.commit()
+    return jsonify(payload)
 
-        payload = get_patient_overview(conn, patient_id)
-        if not payload:
-            return jsonify({"error": "Patient not found"}), 404
 
-        log_action(conn, "PATIENT_OVERVIEW", success=1, doctor_id=doctor["id"], patient_id=patient_id, details="Overview viewed")
+@app.get("/api/doctor/patient/<int:patient_id>/overview/<any(prescriptions, reports):section>")
+@auth_required("doctor")
+def doctor_patient_overview_page(patient_id, section):
+    # Follow-up pages of one overview list. The overview that handed out the
+    # cursor already wrote the PATIENT_OVERVIEW audit row for this view, so
+    # paging through it is not logged again; denials still are.
+    conn = request_db()
+    doctor_id = request.current_user["doctor_id"]
+    if not has_doctor_access(conn, doctor_id, patient_id):
+        log_action(conn, "PATIENT_OVERVIEW", success=0, doctor_id=doctor_id, patient_id=patient_id, details="No active access")
         conn.commit()
-        return jsonify(payload)
+        return jsonify({"error": "Access denied. OTP verification required or expired."}), 403
+
+    before_ts = request.args.get("before_ts")
+    before_id = request.args.get("before_id", type=int if section == "reports" else str)
+    if not before_ts or before_id is None:
+        return jsonify({"error": "before_ts and before_id are required"}), 400
+
+    limit = min(max(request.args.get("limit", OVERVIEW_PAGE_SIZE, type=int), 1), OVERVIEW_MAX_PAGE_SIZE)
+    fetch_page = overview_prescriptions if section == "prescriptions" else overview_reports
+    items, next_cursor = fetch_page(conn, patient_id, limit, (before_ts, before_id))
+    return jsonify({section: items, "next_cursor": next_cursor})
 
 
 @app.post("/api/doctor/patient/<int:patient_id>/reports")
@@ -681,25 +1067,25 @@ def doctor_upload_report(patient_id):
     if file.filename == "":
         return jsonify({"error": "Empty filename"}), 400
 
-    with closing(get_db()) as conn:
-        doctor = doctor_record(conn, request.current_user["id"])
-        if not has_doctor_access(conn, doctor["id"], patient_id):
-            return jsonify({"error": "Access denied. OTP verification required or expired."}), 403
+    conn = request_db()
+    doctor_id = request.current_user["doctor_id"]
+    if not has_doctor_access(conn, doctor_id, patient_id):
+        return jsonify({"error": "Access denied. OTP verification required or expired."}), 403
 
-        safe_name = secure_filename(file.filename)
-        stored_name = f"{datetime.utcnow().strftime('%Y%m%d%H%M%S')}_{secrets.token_hex(4)}_{safe_name}"
-        path = REPORTS_DIR / stored_name
-        file.save(path)
+    safe_name = secure_filename(file.filename)
+    stored_name = f"{time.time_ns()}_{os.urandom(4).hex()}_{safe_name}"
+    path = REPORTS_DIR / stored_name
+    save_upload(file, path)
 
+    with write_transaction(conn):
         conn.execute(
             """
-            INSERT INTO uploaded_reports (patient_id, uploader_user_id, file_name, file_path, uploaded_at)
-            VALUES (?, ?, ?, ?, ?)
+            INSERT INTO uploaded_reports (patient_id, uploader_user_id, file_name, file_path, file_dir, file_basename, uploaded_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
             """,
-            (patient_id, request.current_user["id"], safe_name, str(path), now_iso()),
+            (patient_id, request.current_user["id"], safe_name, str(path), str(REPORTS_DIR), stored_name, now_iso()),
         )
-        log_action(conn, "REPORT_UPLOAD", success=1, doctor_id=doctor["id"], patient_id=patient_id, details=safe_name)
-        conn.commit()
+        log_action(conn, "REPORT_UPLOAD", success=1, doctor_id=doctor_id, patient_id=patient_id, details=safe_name)
 
     return jsonify({"message": "Report uploaded"})
 
@@ -716,42 +1102,38 @@ def create_prescription():
     if not patient_id or not meds:
         return jsonify({"error": "patient_id and medicines are required"}), 400
 
-    with closing(get_db()) as conn:
-        doctor = doctor_record(conn, request.current_user["id"])
-        if not has_doctor_access(conn, doctor["id"], patient_id):
-            return jsonify({"error": "Access denied. OTP verification required or expired."}), 403
-
-        patient = conn.execute("SELECT * FROM patients WHERE id = ?", (patient_id,)).fetchone()
-        if not patient:
-            return jsonify({"error": "Patient not found"}), 404
+    conn = request_db()
+    doctor_id = request.current_user["doctor_id"]
+    if not has_doctor_access(conn, doctor_id, patient_id):
+        return jsonify({"error": "Access denied. OTP verification required or expired."}), 403
 
-        medicine_rows = {
-            row["id"]: dict(row)
-            for row in conn.execute("SELECT * FROM medicines").fetchall()
-        }
-
-        resolved_meds = []
-        for item in meds:
-            med_id = item.get("medicine_id")
-            dosage = (item.get("dosage") or "").strip()
-            if med_id not in medicine_rows:
-                return jsonify({"error": f"Invalid medicine_id: {med_id}"}), 400
-            med = medicine_rows[med_id]
-            resolved_meds.append(
-                {
-                    "medicine_id": med_id,
-                    "brand_name": med["brand_name"],
-                    "generic_name": med["generic_name"],
-                    "dosage": dosage or med["standard_dosage"],
-                    "indications": med["indications"],
-                    "standard_dosage": med["standard_dosage"],
-                    "precautions": med["precautions"],
-                }
-            )
+    patient = conn.execute("SELECT id FROM patients WHERE id = ?", (patient_id,)).fetchone()
+    if not patient:
+        return jsonify({"error": "Patient not found"}), 404
+
+    resolved_meds = []
+    for item in meds:
+        med_id = item.get("medicine_id")
+        dosage = (item.get("dosage") or "").strip()
+        med = MEDICINES_BY_ID.get(med_id)
+        if med is None:
+            return jsonify({"error": f"Invalid medicine_id: {med_id}"}), 400
+        resolved_meds.append(
+            {
+                "medicine_id": med_id,
+                "brand_name": med["brand_name"],
+                "generic_name": med["generic_name"],
+                "dosage": dosage or med["standard_dosage"],
+                "indications": med["indications"],
+                "standard_dosage": med["standard_dosage"],
+                "precautions": med["precautions"],
+            }
+        )
 
-        prescription_id = f"RX-{datetime.utcnow().strftime('%Y%m%d%H%M%S')}-{secrets.token_hex(2).upper()}"
-        qr_payload = f"MEDSETU:{prescription_id}"
+    prescription_id = f"RX-{new_ulid()}"
+    qr_payload = f"MEDSETU:{prescription_id}"
 
+    with write_transaction(conn):
         conn.execute(
             """
             INSERT INTO prescriptions
@@ -760,9 +1142,9 @@ def create_prescription():
             """,
             (
                 prescription_id,
-                doctor["id"],
+                doctor_id,
                 patient_id,
-                json.dumps(resolved_meds),
+                orjson.dumps(resolved_meds).decode(),
                 doctor_notes,
                 digital_signature,
                 now_iso(),
@@ -773,13 +1155,12 @@ def create_prescription():
             conn,
             action="PRESCRIPTION_CREATE",
             success=1,
-            doctor_id=doctor["id"],
+            doctor_id=doctor_id,
             patient_id=patient_id,
             details=prescription_id,
         )
-        conn.commit()
 
-        return jsonify({"message": "Prescription created", "prescription_id": prescription_id, "qr_payload": qr_payload})
+    return jsonify({"message": "Prescription created", "prescription_id": prescription_id, "qr_payload": qr_payload})
 
 
 @app.post("/api/pharmacist/prescriptions/lookup")
@@ -790,52 +1171,43 @@ def pharmacist_lookup():
     if not value:
         return jsonify({"error": "value is required"}), 400
 
-    prescription_id = value
-    if value.startswith("MEDSETU:"):
-        prescription_id = value.split(":", 1)[1]
+    head, sep, tail = value.partition(":")
+    prescription_id = tail if sep and head == "MEDSETU" else value
 
-    with closing(get_db()) as conn:
-        row = conn.execute(
-            """
-            SELECT p.*, d.full_name AS doctor_name, d.medical_registration_number,
-                   pt.full_name AS patient_name, pt.mobile AS patient_mobile
-            FROM prescriptions p
-            JOIN doctors d ON d.id = p.doctor_id
-            JOIN patients pt ON pt.id = p.patient_id
-            WHERE p.prescription_id = ?
-            """,
-            (prescription_id,),
-        ).fetchone()
+    with PRESCRIPTION_CACHE_LOCK:
+        body = PRESCRIPTION_CACHE.get(prescription_id)
+        if body is not None:
+            PRESCRIPTION_CACHE.move_to_end(prescription_id)
+            return Response(body, mimetype="application/json")
 
-        if not row:
-            return jsonify({"error": "Prescription not found"}), 404
+    cur = request_db().cursor()
+    cur.row_factory = None
+    row = cur.execute(SQL_LOOKUP_PRESCRIPTION, (prescription_id,)).fetchone()
 
-        return jsonify(
-            {
-                "prescription": {
-                    "prescription_id": row["prescription_id"],
-                    "doctor_name": row["doctor_name"],
-                    "doctor_reg": row["medical_registration_number"],
-                    "patient_name": row["patient_name"],
-                    "patient_mobile": row["patient_mobile"],
-                    "medicines": json.loads(row["medicines_json"]),
-                    "doctor_notes": row["doctor_notes"],
-                    "status": row["status"],
-                    "created_at": row["created_at"],
-                    "dispensed_at": row["dispensed_at"],
-                    "pharmacist_id": row["pharmacist_id"],
-                }
-            }
-        )
+    if not row:
+        return jsonify({"error": "Prescription not found"}), 404
+
+    prescription = dict(zip(PRESCRIPTION_LOOKUP_KEYS, row))
+    prescription["medicines"] = orjson.Fragment(prescription["medicines"])
+    body = orjson.dumps({"prescription": prescription})
+    if prescription["status"] != "Active":
+        with PRESCRIPTION_CACHE_LOCK:
+            PRESCRIPTION_CACHE[prescription_id] = body
+            if len(PRESCRIPTION_CACHE) > PRESCRIPTION_CACHE_SIZE:
+                PRESCRIPTION_CACHE.popitem(last=False)
+    return Response(body, mimetype="application/json")
 
 
 @app.post("/api/pharmacist/prescriptions/<prescription_id>/dispense")
 @auth_required("pharmacist")
 def pharmacist_dispense(prescription_id):
-    with closing(get_db()) as conn:
-        pharmacist = pharmacist_record(conn, request.current_user["id"])
+    conn = request_db()
+    pharmacist_id = request.current_user["pharmacist_id"]
+    # Read the status under the write lock so two pharmacists cannot both
+    # dispense the same prescription.
+    with write_transaction(conn):
         row = conn.execute(
-            "SELECT * FROM prescriptions WHERE prescription_id = ?",
+            "SELECT patient_id, status FROM prescriptions WHERE prescription_id = ?",
             (prescription_id,),
         ).fetchone()
         if not row:
@@ -846,11 +1218,10 @@ def pharmacist_dispense(prescription_id):
                 conn,
                 action="DISPENSE_ATTEMPT",
                 success=0,
-                pharmacist_id=pharmacist["id"],
+                pharmacist_id=pharmacist_id,
                 patient_id=row["patient_id"],
                 details=f"Blocked for {prescription_id}; status={row['status']}",
             )
-            conn.commit()
             return jsonify({"error": f"Prescription is {row['status']} and cannot be reopened"}), 400
 
         dispensed_time = now_iso()
@@ -860,144 +1231,149 @@ def pharmacist_dispense(prescription_id):
             SET status = 'Expired', dispensed_at = ?, pharmacist_id = ?
             WHERE prescription_id = ?
             """,
-            (dispensed_time, pharmacist["id"], prescription_id),
+            (dispensed_time, pharmacist_id, prescription_id),
         )
         log_action(
             conn,
             action="DISPENSED",
             success=1,
-            pharmacist_id=pharmacist["id"],
+            pharmacist_id=pharmacist_id,
             patient_id=row["patient_id"],
             details=prescription_id,
         )
-        conn.commit()
 
-        return jsonify({"message": "Marked as dispensed. Prescription is now expired.", "dispensed_at": dispensed_time})
+    return jsonify({"message": "Marked as dispensed. Prescription is now expired.", "dispensed_at": dispensed_time})
 
 
 @app.get("/api/patient/history")
 @auth_required("patient")
 def patient_history():
-    with closing(get_db()) as conn:
-        patient = patient_record(conn, request.current_user["id"])
-        if not patient:
-            return jsonify({"error": "Patient profile not found"}), 404
-
-        prescriptions = conn.execute(
-            """
-            SELECT p.*, d.full_name AS doctor_name
-            FROM prescriptions p
-            JOIN doctors d ON d.id = p.doctor_id
-            WHERE p.patient_id = ?
-            ORDER BY p.created_at DESC
-            """,
-            (patient["id"],),
-        ).fetchall()
-
-        external = conn.execute(
-            "SELECT * FROM external_prescriptions WHERE patient_id = ? ORDER BY uploaded_at DESC",
-            (patient["id"],),
-        ).fetchall()
-
-        reports = conn.execute(
-            "SELECT * FROM uploaded_reports WHERE patient_id = ? ORDER BY uploaded_at DESC",
-            (patient["id"],),
-        ).fetchall()
+    conn = request_db()
+    patient = patient_record(conn, request.current_user["id"], "id, full_name, mobile, allergies, chronic_conditions")
+    if not patient:
+        return jsonify({"error": "Patient profile not found"}), 404
+
+    # One pass over all three sources, merged and ordered by SQLite. Only
+    # prescription rows carry the detail columns; the others pad with NULL.
+    # The rows are consumed straight off the cursor as the merge yields them.
+    cur = conn.cursor()
+    cur.row_factory = None
+    rows = cur.execute(
+        """
+        SELECT 'prescription' AS type, p.created_at AS ts, p.prescription_id AS name,
+               p.status, d.full_name AS doctor_name, p.medicines_json, p.doctor_notes,
+               p.digital_signature, p.dispensed_at, p.qr_payload
+        FROM prescriptions p
+        JOIN doctors d ON d.id = p.doctor_id
+        WHERE p.patient_id = ?
+        UNION ALL
+        SELECT 'external_upload', uploaded_at, file_name, 'Uploaded', NULL, NULL, NULL, NULL, NULL, NULL
+        FROM external_prescriptions
+        WHERE patient_id = ?
+        UNION ALL
+        SELECT 'report', uploaded_at, file_name, 'Uploaded', NULL, NULL, NULL, NULL, NULL, NULL
+        FROM uploaded_reports
+        WHERE patient_id = ?
+        ORDER BY ts DESC
+        """,
+        (patient["id"], patient["id"], patient["id"]),
+    )
 
-        timeline = []
-        for p in prescriptions:
+    timeline = []
+    prescriptions = []
+    for kind, ts, name, status, doctor_name, medicines_json, doctor_notes, signature, dispensed_at, qr_payload in rows:
+        if kind == "prescription":
             timeline.append(
                 {
                     "type": "prescription",
-                    "timestamp": p["created_at"],
-                    "title": f"Prescription {p['prescription_id']}",
-                    "status": p["status"],
-                    "doctor_name": p["doctor_name"],
+                    "timestamp": ts,
+                    "title": f"Prescription {name}",
+                    "status": status,
+                    "doctor_name": doctor_name,
+                }
+            )
+            prescriptions.append(
+                {
+                    "prescription_id": name,
+                    "doctor_name": doctor_name,
+                    "medicines": orjson.Fragment(medicines_json),
+                    "doctor_notes": doctor_notes,
+                    "digital_signature": signature,
+                    "status": status,
+                    "created_at": ts,
+                    "dispensed_at": dispensed_at,
+                    "qr_payload": qr_payload,
                 }
             )
-        for e in external:
+        elif kind == "external_upload":
             timeline.append(
                 {
                     "type": "external_upload",
-                    "timestamp": e["uploaded_at"],
-                    "title": f"External Prescription Uploaded: {e['file_name']}",
+                    "timestamp": ts,
+                    "title": f"External Prescription Uploaded: {name}",
                     "status": "Uploaded",
                 }
             )
-        for r in reports:
+        else:
             timeline.append(
                 {
                     "type": "report",
-                    "timestamp": r["uploaded_at"],
-                    "title": f"Report Uploaded: {r['file_name']}",
+                    "timestamp": ts,
+                    "title": f"Report Uploaded: {name}",
                     "status": "Uploaded",
                 }
             )
 
-        timeline.sort(key=lambda x: x["timestamp"], reverse=True)
-
-        return jsonify(
-            {
-                "patient": {
-                    "id": patient["id"],
-                    "full_name": patient["full_name"],
-                    "mobile": patient["mobile"],
-                    "allergies": json.loads(patient["allergies"] or "[]"),
-                    "chronic_conditions": json.loads(patient["chronic_conditions"] or "[]"),
-                },
-                "prescriptions": [
-                    {
-                        "prescription_id": p["prescription_id"],
-                        "doctor_name": p["doctor_name"],
-                        "medicines": json.loads(p["medicines_json"]),
-                        "doctor_notes": p["doctor_notes"],
-                        "digital_signature": p["digital_signature"],
-                        "status": p["status"],
-                        "created_at": p["created_at"],
-                        "dispensed_at": p["dispensed_at"],
-                        "qr_payload": p["qr_payload"],
-                    }
-                    for p in prescriptions
-                ],
-                "timeline": timeline,
-            }
-        )
+    return jsonify(
+        {
+            "patient": {
+                "id": patient["id"],
+                "full_name": patient["full_name"],
+                "mobile": patient["mobile"],
+                "allergies": orjson.Fragment(patient["allergies"] or "[]"),
+                "chronic_conditions": orjson.Fragment(patient["chronic_conditions"] or "[]"),
+            },
+            "prescriptions": prescriptions,
+            "timeline": timeline,
+        }
+    )
 
 
 @app.get("/api/patient/access-logs")
 @auth_required("patient")
 def patient_access_logs():
-    with closing(get_db()) as conn:
-        patient = patient_record(conn, request.current_user["id"])
-        logs = conn.execute(
-            """
-            SELECT l.*, d.full_name AS doctor_name, ph.full_name AS pharmacist_name
-            FROM access_logs l
-            LEFT JOIN doctors d ON d.id = l.doctor_id
-            LEFT JOIN pharmacists ph ON ph.id = l.pharmacist_id
-            WHERE l.patient_id = ?
-            ORDER BY l.created_at DESC
-            """,
-            (patient["id"],),
-        ).fetchall()
+    conn = request_db()
+    patient_id = request.current_user["patient_id"]
+    logs = conn.execute(
+        """
+        SELECT l.id, l.action, l.success, l.details, l.created_at, l.expires_at,
+               d.full_name AS doctor_name, ph.full_name AS pharmacist_name
+        FROM access_logs l
+        LEFT JOIN doctors d ON d.id = l.doctor_id
+        LEFT JOIN pharmacists ph ON ph.id = l.pharmacist_id
+        WHERE l.patient_id = ?
+        ORDER BY l.created_at DESC
+        """,
+        (patient_id,),
+    ).fetchall()
 
-        return jsonify(
-            {
-                "logs": [
-                    {
-                        "id": r["id"],
-                        "action": r["action"],
-                        "success": bool(r["success"]),
-                        "details": r["details"],
-                        "doctor_name": r["doctor_name"],
-                        "pharmacist_name": r["pharmacist_name"],
-                        "created_at": r["created_at"],
-                        "expires_at": r["expires_at"],
-                    }
-                    for r in logs
-                ]
-            }
-        )
+    return jsonify(
+        {
+            "logs": [
+                {
+                    "id": r["id"],
+                    "action": r["action"],
+                    "success": bool(r["success"]),
+                    "details": r["details"],
+                    "doctor_name": r["doctor_name"],
+                    "pharmacist_name": r["pharmacist_name"],
+                    "created_at": r["created_at"],
+                    "expires_at": r["expires_at"],
+                }
+                for r in logs
+            ]
+        }
+    )
 
 
 @app.post("/api/patient/external-prescriptions")
@@ -1010,64 +1386,61 @@ def upload_external_prescription():
     if file.filename == "":
         return jsonify({"error": "Empty filename"}), 400
 
-    with closing(get_db()) as conn:
-        patient = patient_record(conn, request.current_user["id"])
-        safe_name = secure_filename(file.filename)
-        stored_name = f"{datetime.utcnow().strftime('%Y%m%d%H%M%S')}_{secrets.token_hex(4)}_{safe_name}"
-        path = EXTERNAL_DIR / stored_name
-        file.save(path)
+    conn = request_db()
+    patient_id = request.current_user["patient_id"]
+    safe_name = secure_filename(file.filename)
+    stored_name = f"{time.time_ns()}_{os.urandom(4).hex()}_{safe_name}"
+    path = EXTERNAL_DIR / stored_name
+    save_upload(file, path)
 
-        conn.execute(
-            """
-            INSERT INTO external_prescriptions (patient_id, file_name, file_path, uploaded_at)
-            VALUES (?, ?, ?, ?)
-            """,
-            (patient["id"], safe_name, str(path), now_iso()),
-        )
-        conn.commit()
+    conn.execute(
+        """
+        INSERT INTO external_prescriptions (patient_id, file_name, file_path, file_dir, file_basename, uploaded_at)
+        VALUES (?, ?, ?, ?, ?, ?)
+        """,
+        (patient_id, safe_name, str(path), str(EXTERNAL_DIR), stored_name, now_iso()),
+    )
+    conn.commit()
 
-        return jsonify({"message": "External prescription uploaded"})
+    return jsonify({"message": "External prescription uploaded"})
 
 
 @app.get("/api/files/reports/<int:file_id>")
 @auth_required()
 def get_report_file(file_id):
-    with closing(get_db()) as conn:
-        report = conn.execute("SELECT * FROM uploaded_reports WHERE id = ?", (file_id,)).fetchone()
-        if not report:
-            return jsonify({"error": "File not found"}), 404
-
-        user = request.current_user
-        if user["role"] == "patient":
-            patient = patient_record(conn, user["id"])
-            if not patient or patient["id"] != report["patient_id"]:
-                return jsonify({"error": "Forbidden"}), 403
-        elif user["role"] == "doctor":
-            doctor = doctor_record(conn, user["id"])
-            if not has_doctor_access(conn, doctor["id"], report["patient_id"]):
-                return jsonify({"error": "Forbidden. OTP access required."}), 403
+    conn = request_db()
+    report = conn.execute("SELECT patient_id, file_name, file_dir, file_basename FROM uploaded_reports WHERE id = ?", (file_id,)).fetchone()
+    if not report:
+        return jsonify({"error": "File not found"}), 404
 
-        folder = str(Path(report["file_path"]).parent)
-        filename = Path(report["file_path"]).name
-        return send_from_directory(folder, filename, as_attachment=True, download_name=report["file_name"])
+    user = request.current_user
+    if user["role"] == "patient":
+        if user["patient_id"] is None or user["patient_id"] != report["patient_id"]:
+            return jsonify({"error": "Forbidden"}), 403
+    elif user["role"] == "doctor":
+        if not has_doctor_access(conn, user["doctor_id"], report["patient_id"]):
+            return jsonify({"error": "Forbidden. OTP access required."}), 403
+
+    return send_upload(report["file_dir"], report["file_basename"], report["file_name"])
 
 
 @app.get("/api/files/external/<int:file_id>")
 @auth_required("patient")
 def get_external_file(file_id):
-    with closing(get_db()) as conn:
-        patient = patient_record(conn, request.current_user["id"])
-        row = conn.execute("SELECT * FROM external_prescriptions WHERE id = ?", (file_id,)).fetchone()
-        if not row or row["patient_id"] != patient["id"]:
-            return jsonify({"error": "File not found"}), 404
+    conn = request_db()
+    patient_id = request.current_user["patient_id"]
+    row = conn.execute("SELECT patient_id, file_name, file_dir, file_basename FROM external_prescriptions WHERE id = ?", (file_id,)).fetchone()
+    if not row or row["patient_id"] != patient_id:
+        return jsonify({"error": "File not found"}), 404
+
+    return send_upload(row["file_dir"], row["file_basename"], row["file_name"])
 
-        folder = str(Path(row["file_path"]).parent)
-        filename = Path(row["file_path"]).name
-        return send_from_directory(folder, filename, as_attachment=True, download_name=row["file_name"])
 
+init_db()
 
 if __name__ == "__main__":
-    init_db()
-    app.run(debug=True, host="0.0.0.0", port=5000)
-else:
-    init_db()
+    # Development server only. In production serve the app through a WSGI
+    # server, e.g. `gunicorn -w "$(nproc)" -k gthread --threads 8 app:app`;
+    # each worker thread keeps its own SQLite connection and WAL lets readers
+    # run alongside the writer.
+    app.run(debug=os.environ.get("FLASK_DEBUG") == "1", host="0.0.0.0", port=5000, threaded=True)